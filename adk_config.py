@@ -5,10 +5,27 @@ Configuration file for Google ADK web interface
 """
 
 import os
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 
-# ADK Web Interface Configuration
-ADK_CONFIG = {
+def _freeze(value: Any) -> Any:
+    """Read-only copy of nested config: dicts become mapping proxies, lists tuples"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value: Any) -> Any:
+    """Plain, independent copy of frozen config for callers: mappings become dicts, tuples lists"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+# ADK Web Interface Configuration (read-only at every level, getters hand out copies)
+ADK_CONFIG = _freeze({
     "app_name": "PDF Validator Agent",
     "version": "2.0.0",
     "description": "Validasi dokumen PDF permohonan VPN menggunakan Google Gemini 2.0",
@@ -63,11 +80,22 @@ ADK_CONFIG = {
         "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         "file": "logs/adk_web.log"
     }
-}
+})
+
+# Environment overrides: (env var, config section, key, cast)
+ENV_OVERRIDES = (
+    ("ADK_WEB_PORT", "adk_web", "port", int),
+    ("ADK_WEB_HOST", "adk_web", "host", str),
+    ("ADK_WEB_DEBUG", "adk_web", "debug", lambda value: value.lower() == "true"),
+    ("MAX_FILE_SIZE_MB", "upload", "max_file_size_mb", int),
+    ("MIN_SIGNATURES", "validation", "min_signatures", int),
+    ("GEMINI_MODEL", "gemini", "model", str),
+    ("LOG_LEVEL", "logging", "level", str),
+)
 
 def get_adk_config() -> Dict[str, Any]:
-    """Get ADK configuration"""
-    return ADK_CONFIG
+    """Get base ADK configuration"""
+    return _thaw(ADK_CONFIG)
 
 def get_adk_endpoint(endpoint_name: str) -> str:
     """Get ADK endpoint URL"""
@@ -79,52 +107,43 @@ def is_adk_web_enabled() -> bool:
 
 def get_upload_config() -> Dict[str, Any]:
     """Get upload configuration"""
-    return ADK_CONFIG["upload"]
+    return _thaw(ADK_CONFIG["upload"])
 
 def get_validation_config() -> Dict[str, Any]:
     """Get validation configuration"""
-    return ADK_CONFIG["validation"]
+    return _thaw(ADK_CONFIG["validation"])
 
 def get_gemini_config() -> Dict[str, Any]:
     """Get Gemini configuration"""
-    return ADK_CONFIG["gemini"]
+    return _thaw(ADK_CONFIG["gemini"])
 
 def get_logging_config() -> Dict[str, Any]:
     """Get logging configuration"""
-    return ADK_CONFIG["logging"]
+    return _thaw(ADK_CONFIG["logging"])
 
 # Environment-specific overrides
+def _merge_config(base: Mapping[str, Any], overrides: Dict[str, Dict[str, Any]]) -> Mapping[str, Any]:
+    """Merge section overrides into base, copying only the touched sections"""
+    config = dict(base)
+    for section, values in overrides.items():
+        config[section] = _freeze({**base[section], **values})
+    return MappingProxyType(config)
+
 def load_adk_config_from_env():
     """Load ADK configuration from environment variables"""
-    config = ADK_CONFIG.copy()
-    
-    # Override from environment variables
-    if os.getenv("ADK_WEB_PORT"):
-        config["adk_web"]["port"] = int(os.getenv("ADK_WEB_PORT"))
-    
-    if os.getenv("ADK_WEB_HOST"):
-        config["adk_web"]["host"] = os.getenv("ADK_WEB_HOST")
-    
-    if os.getenv("ADK_WEB_DEBUG"):
-        config["adk_web"]["debug"] = os.getenv("ADK_WEB_DEBUG").lower() == "true"
-    
-    if os.getenv("MAX_FILE_SIZE_MB"):
-        config["upload"]["max_file_size_mb"] = int(os.getenv("MAX_FILE_SIZE_MB"))
-    
-    if os.getenv("MIN_SIGNATURES"):
-        config["validation"]["min_signatures"] = int(os.getenv("MIN_SIGNATURES"))
-    
-    if os.getenv("GEMINI_MODEL"):
-        config["gemini"]["model"] = os.getenv("GEMINI_MODEL")
+    env = os.environ
+    overrides = {}
     
-    if os.getenv("LOG_LEVEL"):
-        config["logging"]["level"] = os.getenv("LOG_LEVEL")
+    for env_name, section, key, cast in ENV_OVERRIDES:
+        value = env.get(env_name)
+        if value:
+            overrides.setdefault(section, {})[key] = cast(value)
     
-    return config
+    return _merge_config(ADK_CONFIG, overrides)
 
 # Get final configuration
 FINAL_ADK_CONFIG = load_adk_config_from_env()
 
 def get_final_config() -> Dict[str, Any]:
     """Get final ADK configuration with environment overrides"""
-    return FINAL_ADK_CONFIG
+    return _thaw(FINAL_ADK_CONFIG)
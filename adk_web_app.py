@@ -7,43 +7,86 @@ Compatible with Google ADK web interface
 import os
 import sys
 import json
-import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, List
-from pdf_validator_agent import PDFValidatorAgent
+from pdf_validator_agent import get_validator_agent
+from gemini_judge import GEMINI_MODEL_NAME
 from config import settings
 
+PDF_SUFFIX = ".pdf"
+
+@lru_cache(maxsize=1)
+def _configuration() -> Dict[str, Any]:
+    """Configuration summary, built once from the immutable settings"""
+    s = settings
+    return {
+        "app_name": s.app_name,
+        "min_signatures": s.min_signatures,
+        "max_file_size_mb": s.max_file_size_mb,
+        "log_level": s.log_level,
+        "google_api_configured": bool(s.google_api_key),
+        "langfuse_configured": bool(s.langfuse_public_key),
+        "gemini_model": GEMINI_MODEL_NAME
+    }
+
 class ADKWebApp:
     """Google ADK Web Application for PDF Validator"""
     
     def __init__(self):
-        self.agent = None
-        self.initialize_agent()
+        self._agent = None
+        self._agent_error = None
+        self._agent_lock = threading.Lock()
+        self.max_file_size_bytes = settings.max_file_size_mb * 1024 * 1024
+    
+    @property
+    def agent(self):
+        """PDF Validator Agent, created on first use (None if construction failed)"""
+        if self._agent is None and self._agent_error is None:
+            self.initialize_agent()
+        return self._agent
     
     def initialize_agent(self):
-        """Initialize the PDF Validator Agent"""
-        try:
-            self.agent = PDFValidatorAgent()
-            print("✓ PDF Validator Agent initialized for Google ADK")
-            return True
-        except Exception as e:
-            print(f"✗ Error initializing agent: {e}")
-            return False
+        """Initialize the PDF Validator Agent, a failure is recorded once and not retried"""
+        with self._agent_lock:
+            if self._agent is not None:
+                return True
+            if self._agent_error is not None:
+                return False
+            try:
+                self._agent = get_validator_agent()
+                print("✓ PDF Validator Agent initialized for Google ADK")
+                return True
+            except Exception as e:
+                self._agent_error = e
+                print(f"✗ Error initializing agent: {e}")
+                return False
     
-    def validate_pdf_from_path(self, pdf_path: str) -> Dict[str, Any]:
+    def _agent_unavailable(self) -> Dict[str, Any]:
+        """Error response for requests made without an agent"""
+        return {"error": f"Agent not initialized: {self._agent_error}"}
+    
+    def validate_pdf_from_path(self, pdf_path: str, use_cache: bool = True) -> Dict[str, Any]:
         """Validate PDF from file path"""
         if not self.agent:
-            return {"error": "Agent not initialized"}
+            return self._agent_unavailable()
+        
+        # Check the extension first, it needs no filesystem access
+        if pdf_path[-len(PDF_SUFFIX):].lower() != PDF_SUFFIX:
+            return {"error": "File must be a PDF"}
         
         if not os.path.exists(pdf_path):
             return {"error": f"File not found: {pdf_path}"}
         
-        if not pdf_path.lower().endswith('.pdf'):
-            return {"error": "File must be a PDF"}
+        if os.path.getsize(pdf_path) > self.max_file_size_bytes:
+            return {"error": f"File exceeds maximum size of {settings.max_file_size_mb} MB"}
         
         try:
             print(f"Validating PDF: {os.path.basename(pdf_path)}")
-            result = self.agent.validate_pdf_file(pdf_path)
+            result = self.agent.validate_pdf_file(pdf_path, use_cache=use_cache)
             
             # Format result for ADK web
             return self.format_result_for_adk(result)
@@ -58,16 +101,15 @@ class ADKWebApp:
     def validate_pdf_from_bytes(self, pdf_bytes: bytes, filename: str = "document.pdf") -> Dict[str, Any]:
         """Validate PDF from bytes data"""
         if not self.agent:
-            return {"error": "Agent not initialized"}
+            return self._agent_unavailable()
+        
+        # Reject oversized uploads before any parsing
+        if len(pdf_bytes) > self.max_file_size_bytes:
+            return {"error": f"File exceeds maximum size of {settings.max_file_size_mb} MB"}
         
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                temp_file.write(pdf_bytes)
-                temp_file_path = temp_file.name
-            
             print(f"Validating PDF from bytes: {filename}")
-            result = self.agent.validate_pdf_file(temp_file_path)
+            result = self.agent.validate_pdf_bytes(pdf_bytes, filename)
             
             # Add file info
             result["file_info"] = {
@@ -76,9 +118,6 @@ class ADKWebApp:
                 "file_size_mb": round(len(pdf_bytes) / (1024 * 1024), 2)
             }
             
-            # Clean up temp file
-            os.unlink(temp_file_path)
-            
             return self.format_result_for_adk(result)
             
         except Exception as e:
@@ -90,58 +129,73 @@ class ADKWebApp:
     
     def format_result_for_adk(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """Format result for Google ADK web interface"""
-        final_result = result.get("final_result", {})
+        result_get = result.get
+        final_get = result_get("final_result", {}).get
+        file_path = result_get("file_path", "")
         
         # Create ADK-compatible response
         adk_result = {
             "success": True,
-            "file_path": result.get("file_path", ""),
-            "filename": os.path.basename(result.get("file_path", "")),
-            "processing_time_seconds": result.get("processing_time_seconds", 0),
-            "timestamp": result.get("timestamp", ""),
+            "file_path": file_path,
+            "filename": result_get("filename") or os.path.basename(file_path),
+            "processing_time_seconds": result_get("processing_time_seconds", 0),
+            "timestamp": result_get("timestamp", ""),
             
             # Validation results
-            "is_valid": final_result.get("is_valid", False),
-            "status": final_result.get("status", "unknown"),
-            "message": final_result.get("message", ""),
-            "confidence": final_result.get("confidence", 0.0),
-            "document_type": final_result.get("document_type", "unknown"),
-            "signature_count": final_result.get("signature_count", 0),
-            "signature_valid": final_result.get("signature_valid", False),
+            "is_valid": final_get("is_valid", False),
+            "status": final_get("status", "unknown"),
+            "message": final_get("message", ""),
+            "confidence": final_get("confidence", 0.0),
+            "document_type": final_get("document_type", "unknown"),
+            "signature_count": final_get("signature_count", 0),
+            "signature_valid": final_get("signature_valid", False),
             
             # Issues and recommendations
-            "issues": final_result.get("issues", []),
-            "recommendations": final_result.get("recommendations", []),
-            "reasoning": final_result.get("reasoning", ""),
+            "issues": final_get("issues", []),
+            "recommendations": final_get("recommendations", []),
+            "reasoning": final_get("reasoning", ""),
             
             # File info if available
-            "file_info": result.get("file_info", {}),
-            
-            # Raw result for debugging
-            "raw_result": result
+            "file_info": result_get("file_info", {})
         }
         
+        # Raw result duplicates everything above, only include it for debugging
+        if settings.debug:
+            adk_result["raw_result"] = result
+        
         return adk_result
     
-    def batch_validate_pdfs(self, pdf_paths: List[str]) -> Dict[str, Any]:
+    def batch_validate_pdfs(self, pdf_paths: List[str], use_cache: bool = True) -> Dict[str, Any]:
         """Validate multiple PDF files"""
         if not self.agent:
-            return {"error": "Agent not initialized"}
+            return self._agent_unavailable()
         
-        results = []
-        for i, pdf_path in enumerate(pdf_paths, 1):
-            print(f"Processing {i}/{len(pdf_paths)}: {os.path.basename(pdf_path)}")
-            result = self.validate_pdf_from_path(pdf_path)
-            results.append(result)
+        # Validations are dominated by Gemini latency, so overlap them
+        results = [None] * len(pdf_paths)
+        max_workers = max(1, min(settings.batch_concurrency, len(pdf_paths)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.validate_pdf_from_path, pdf_path, use_cache): index
+                for index, pdf_path in enumerate(pdf_paths)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                print(f"Processed {done}/{len(pdf_paths)}: {os.path.basename(pdf_paths[index])}")
+                results[index] = future.result()
         
-        # Generate summary
-        successful_results = [r for r in results if r.get("success", False)]
+        # Generate summary in a single pass, keyed by (success, is_valid)
+        counts = Counter(
+            (bool(r.get("success", False)), bool(r.get("is_valid", False))) for r in results
+        )
+        approved = counts[(True, True)]
+        rejected = counts[(True, False)]
+        successful = approved + rejected
         summary = {
             "total_files": len(pdf_paths),
-            "successful_validations": len(successful_results),
-            "failed_validations": len(results) - len(successful_results),
-            "approved_count": sum(1 for r in successful_results if r.get("is_valid", False)),
-            "rejected_count": sum(1 for r in successful_results if not r.get("is_valid", False))
+            "successful_validations": successful,
+            "failed_validations": len(results) - successful,
+            "approved_count": approved,
+            "rejected_count": rejected
         }
         
         return {
@@ -152,32 +206,26 @@ class ADKWebApp:
     
     def get_configuration(self) -> Dict[str, Any]:
         """Get current configuration"""
-        return {
-            "app_name": settings.app_name,
-            "min_signatures": settings.min_signatures,
-            "max_file_size_mb": settings.max_file_size_mb,
-            "log_level": settings.log_level,
-            "google_api_configured": bool(settings.google_api_key),
-            "langfuse_configured": bool(settings.langfuse_public_key),
-            "gemini_model": "gemini-2.0-flash-exp"
-        }
+        # Settings are immutable, so the dict is built once and copied out
+        return dict(_configuration())
     
     def health_check(self) -> Dict[str, Any]:
         """Health check for ADK"""
         try:
             if self.agent:
+                s = settings
                 return {
                     "status": "healthy",
-                    "app_name": settings.app_name,
-                    "gemini_model": "gemini-2.0-flash-exp",
-                    "google_api_configured": bool(settings.google_api_key),
-                    "langfuse_configured": bool(settings.langfuse_public_key),
+                    "app_name": s.app_name,
+                    "gemini_model": GEMINI_MODEL_NAME,
+                    "google_api_configured": bool(s.google_api_key),
+                    "langfuse_configured": bool(s.langfuse_public_key),
                     "agent_initialized": True
                 }
             else:
                 return {
                     "status": "unhealthy",
-                    "error": "Agent not initialized",
+                    **self._agent_unavailable(),
                     "agent_initialized": False
                 }
         except Exception as e:
@@ -189,12 +237,15 @@ class ADKWebApp:
 
 # Global app instance for ADK
 adk_app = None
+_adk_app_lock = threading.Lock()
 
 def get_adk_app():
     """Get or create ADK app instance"""
     global adk_app
     if adk_app is None:
-        adk_app = ADKWebApp()
+        with _adk_app_lock:
+            if adk_app is None:
+                adk_app = ADKWebApp()
     return adk_app
 
 # ADK Web Interface Functions
@@ -208,10 +259,10 @@ def validate_pdf_bytes(pdf_bytes: bytes, filename: str = "document.pdf") -> Dict
     app = get_adk_app()
     return app.validate_pdf_from_bytes(pdf_bytes, filename)
 
-def batch_validate(pdf_paths: List[str]) -> Dict[str, Any]:
+def batch_validate(pdf_paths: List[str], use_cache: bool = True) -> Dict[str, Any]:
     """ADK web function to validate multiple PDFs"""
     app = get_adk_app()
-    return app.batch_validate_pdfs(pdf_paths)
+    return app.batch_validate_pdfs(pdf_paths, use_cache)
 
 def get_config() -> Dict[str, Any]:
     """ADK web function to get configuration"""
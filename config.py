@@ -1,26 +1,68 @@
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from functools import lru_cache
 
-load_dotenv()
+# Deployments that inject the environment directly can skip parsing .env
+if os.getenv("PDFCHECK_SKIP_DOTENV") != "1":
+    from dotenv import load_dotenv
+    load_dotenv()
 
+@dataclass(frozen=True)
 class Settings:
-    """Simple settings class using environment variables directly"""
-    
-    def __init__(self):
-        # Google Gemini API
-        self.google_api_key = os.getenv("GOOGLE_API_KEY", "")
-        
-        # Langfuse Configuration
-        self.langfuse_public_key = os.getenv("LF_PUBLIC_KEY", "")
-        self.langfuse_secret_key = os.getenv("LF_SECRET_KEY", "")
-        self.langfuse_host = os.getenv("LF_HOST", "https://api.langfuse.com")
-        
-        # Application Configuration
-        self.app_name = os.getenv("APP_NAME", "PDF_Validator_Agent")
-        self.log_level = os.getenv("LOG_LEVEL", "INFO")
-        
-        # PDF Processing Configuration
-        self.min_signatures = int(os.getenv("MIN_SIGNATURES", "3"))
-        self.max_file_size_mb = int(os.getenv("MAX_FILE_SIZE_MB", "10"))
-
-settings = Settings()
+    """Immutable settings read from environment variables"""
+
+    # Google Gemini API
+    google_api_key: str = ""
+
+    # Langfuse Configuration
+    langfuse_public_key: str = ""
+    langfuse_secret_key: str = ""
+    langfuse_host: str = "https://api.langfuse.com"
+
+    # Application Configuration
+    app_name: str = "PDF_Validator_Agent"
+    log_level: str = "INFO"
+    debug: bool = False
+
+    # PDF Processing Configuration
+    min_signatures: int = 3
+    max_file_size_mb: int = 10
+
+    # Batch Processing Configuration
+    batch_concurrency: int = 4
+    result_cache_size: int = 128
+    llm_cache_size: int = 256
+    pdf_cache_size: int = 32
+    llm_max_concurrency: int = 8
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from the current environment"""
+        env = os.environ
+        return cls(
+            google_api_key=env.get("GOOGLE_API_KEY", ""),
+            langfuse_public_key=env.get("LF_PUBLIC_KEY", ""),
+            langfuse_secret_key=env.get("LF_SECRET_KEY", ""),
+            langfuse_host=env.get("LF_HOST", "https://api.langfuse.com"),
+            app_name=env.get("APP_NAME", "PDF_Validator_Agent"),
+            log_level=env.get("LOG_LEVEL", "INFO"),
+            debug=env.get("DEBUG", "false").lower() == "true",
+            min_signatures=int(env.get("MIN_SIGNATURES", "3")),
+            max_file_size_mb=int(env.get("MAX_FILE_SIZE_MB", "10")),
+            batch_concurrency=int(env.get("BATCH_CONCURRENCY", "4")),
+            result_cache_size=int(env.get("RESULT_CACHE_SIZE", "128")),
+            llm_cache_size=int(env.get("LLM_CACHE_SIZE", "256")),
+            pdf_cache_size=int(env.get("PDF_CACHE_SIZE", "32")),
+            llm_max_concurrency=int(env.get("LLM_MAX_CONCURRENCY", "8"))
+        )
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the process-wide settings, parsed once on first use"""
+    return Settings.from_env()
+
+def __getattr__(name: str):
+    # Keeps `from config import settings` working
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
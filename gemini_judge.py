@@ -1,31 +1,144 @@
+import re
+import sys
+import time
+import asyncio
+import copy
 import json
-import google.generativeai as genai
-from typing import Dict, Any, List, Optional
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
 from config import settings
+from adk_config import get_final_config
 from langfuse_utils import send_trace_minimal
 
-class GeminiJudge:
-    """LLM Judge using Google Gemini for PDF validation"""
-    
-    def __init__(self):
-        self.api_key = settings.google_api_key
-        if not self.api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
-        
-        # Configure Gemini
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
-    def create_validation_prompt(self, validation_data: Dict[str, Any]) -> str:
-        """
-        Create a comprehensive prompt for Gemini to evaluate the PDF
-        """
-        prompt = f"""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    # Rate limits and transient outages, worth retrying before falling back
+    RETRYABLE_ERRORS = (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded
+    )
+except ImportError:
+    RETRYABLE_ERRORS = ()
+
+# Gemini call limits
+LLM_REQUEST_TIMEOUT = 60
+LLM_MAX_ATTEMPTS = 3
+LLM_BACKOFF_MIN = 1.0
+LLM_BACKOFF_MAX = 30.0
+
+# Output token limit of Gemini 2.0 Flash, packed calls may not ask for more
+GEMINI_MAX_OUTPUT_TOKENS = 8192
+
+# Process-wide cap on concurrent Gemini calls, shared by every judge and batch (sync and async)
+GEMINI_CALL_SLOTS = threading.BoundedSemaphore(max(1, settings.llm_max_concurrency))
+
+# Raw text is only supporting context, cap it to keep prompts bounded
+MAX_RAW_TEXT_CHARS = 20000
+
+# Markdown code fence Gemini sometimes wraps around its JSON answer
+CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+# Form fields every VPN request must fill in, interned to match the extracted field keys
+REQUIRED_FIELDS = tuple(sys.intern(field) for field in (
+    "NIK", "Nama", "No Tel", "Email", "Departement",
+    "Manager", "Range Tanggal", "Range Waktu", "Approved by", "User VPN"
+))
+
+# Applicant email must be on the company domain
+EMAIL_DOMAIN_RE = re.compile(r"@infomedia\.co\.id\s*$", re.IGNORECASE)
+
+# Evaluation statuses whose result is final for the same input, the others are fallbacks
+CACHEABLE_LLM_STATUSES = frozenset(("success", "cached", "rule_rejected"))
+
+# Consecutive LLM errors after which batch_evaluate stops calling Gemini
+CIRCUIT_BREAKER_THRESHOLD = 5
+
+# Fixed shape of a rule-based fallback result, copied and filled in per call
+FALLBACK_RESULT_TEMPLATE = {
+    "is_valid": False,
+    "status": "rejected_with_reason",
+    "confidence": 0.3,  # Low confidence for fallback
+    "issues": None,
+    "reasoning": None,
+    "missing_fields": None,
+    "signature_analysis": None,
+    "document_type_analysis": None,
+    "recommendations": None
+}
+FALLBACK_RECOMMENDATIONS = (
+    "Please ensure all required fields are filled and document has sufficient signatures",
+)
+
+def _json_dumps(obj: Any, sort_keys: bool = False) -> str:
+    """Compact JSON with non-ASCII kept, via orjson when it can encode the object"""
+    if orjson is not None:
+        try:
+            option = orjson.OPT_SORT_KEYS if sort_keys else 0
+            return orjson.dumps(obj, default=str, option=option).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False, separators=(",", ":"), default=str)
+
+def _release_abandoned_slot(acquire: "asyncio.Future[bool]"):
+    """Give back a slot acquired on behalf of a cancelled caller"""
+    if not acquire.cancelled() and acquire.exception() is None:
+        GEMINI_CALL_SLOTS.release()
+
+@asynccontextmanager
+async def _async_call_slot():
+    """Hold a GEMINI_CALL_SLOTS slot, waiting for it off the event loop"""
+    acquire = asyncio.ensure_future(asyncio.to_thread(GEMINI_CALL_SLOTS.acquire))
+    try:
+        await asyncio.shield(acquire)
+    except asyncio.CancelledError:
+        # The waiting thread still takes the slot, release it when it does
+        acquire.add_done_callback(_release_abandoned_slot)
+        raise
+    try:
+        yield
+    finally:
+        GEMINI_CALL_SLOTS.release()
+
+def _json_loads(text: str) -> Any:
+    """Parse JSON with orjson when available (raises json.JSONDecodeError either way)"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _parse_json_response(text: str) -> Any:
+    """
+    Parse the JSON object in a Gemini answer, tolerating code fences and
+    prose around it (raises json.JSONDecodeError if there is none)
+    """
+    text = CODE_FENCE_RE.sub("", text.strip())
+    try:
+        return _json_loads(text)
+    except json.JSONDecodeError:
+        start = text.find("{")
+        end = text.rfind("}", start + 1) if start != -1 else -1
+        # Nothing around the braces to strip, the object itself is malformed
+        if end == -1 or (start == 0 and end == len(text) - 1):
+            raise
+        return _json_loads(text[start:end + 1])
+
+# Static prompt text, only the extracted data and two scalars change per call
+VALIDATION_PROMPT_TEMPLATE = """
 Anda adalah seorang AI Judge yang bertugas mengevaluasi dokumen permohonan VPN. 
 Tugas Anda adalah menganalisis data yang diekstrak dari PDF dan memberikan keputusan final.
 
 DATA YANG DIEKSTRAK:
-{json.dumps(validation_data, indent=2, ensure_ascii=False)}
+{payload}
 
 KRITERIA EVALUASI:
 1. KELENGKAPAN DATA:
@@ -43,10 +156,10 @@ KRITERIA EVALUASI:
 2. VALIDASI TANDA TANGAN:
    - Dokumen harus memiliki minimal 3 tanda tangan
    - Tanda tangan harus dari: pemohon, atasan, dan pihak IT
-   - Jumlah tanda tangan saat ini: {validation_data.get('signature_count', 0)}
+   - Jumlah tanda tangan saat ini: {signature_count}
 
 3. JENIS DOKUMEN:
-   - Tipe dokumen terdeteksi: {validation_data.get('document_type', 'unknown')}
+   - Tipe dokumen terdeteksi: {document_type}
    - Pastikan dokumen adalah permohonan VPN baru atau perpanjangan VPN
 
 4. KONSISTENSI DATA:
@@ -86,59 +199,294 @@ PENTING:
 
 Jawab hanya dengan JSON, tanpa teks tambahan.
 """
-        return prompt
+
+# Several documents per call: shared instructions are sent once and the
+# answer must be a JSON array with one entry per numbered document
+PACKED_PROMPT_TEMPLATE = """
+Anda adalah seorang AI Judge yang bertugas mengevaluasi dokumen permohonan VPN. 
+Evaluasi {count} dokumen berikut secara terpisah. Setiap dokumen diberi nomor.
+
+{documents}
+
+KRITERIA EVALUASI (untuk setiap dokumen):
+1. Semua field berikut harus diisi: NIK (angka), Nama, No Tel, Email (domain @infomedia.co.id),
+   Departement, Manager, Range Tanggal, Range Waktu, Approved by, User VPN
+2. Dokumen harus memiliki minimal 3 tanda tangan (lihat signature_count)
+3. Dokumen harus permohonan VPN baru atau perpanjangan VPN (lihat document_type)
+4. Nama harus konsisten dengan User VPN, tanggal dan waktu harus logis
+
+TUGAS ANDA:
+Jawab dengan JSON array berisi tepat {count} objek, satu untuk setiap dokumen, dengan struktur:
+
+{{
+    "id": nomor dokumen (integer),
+    "is_valid": boolean,
+    "status": "approved_for_processing" atau "rejected_with_reason",
+    "confidence": float (0.0 - 1.0),
+    "issues": [list of issues found],
+    "reasoning": "penjelasan singkat keputusan",
+    "missing_fields": [list of missing required fields],
+    "recommendations": [list of recommendations for improvement]
+}}
+
+Jawab hanya dengan JSON array, tanpa teks tambahan.
+"""
+
+GEMINI_CONFIG = get_final_config()["gemini"]
+GEMINI_MODEL_NAME = GEMINI_CONFIG["model"]
+
+@lru_cache(maxsize=None)
+def _get_model(api_key: str, model_name: str = GEMINI_MODEL_NAME):
+    """
+    Get a shared Gemini model per API key so its client connection is reused
+    """
+    # Imported on first use, the SDK pulls in gRPC and protobuf
+    import google.generativeai as genai
+    
+    genai.configure(api_key=api_key)
+    # JSON mode: Gemini answers with bare JSON instead of fenced or prose-wrapped text
+    generation_config = genai.GenerationConfig(
+        temperature=GEMINI_CONFIG["temperature"],
+        max_output_tokens=GEMINI_CONFIG["max_tokens"],
+        response_mime_type="application/json"
+    )
+    return genai.GenerativeModel(model_name, generation_config=generation_config)
+
+class GeminiJudge:
+    """LLM Judge using Google Gemini for PDF validation"""
+    
+    def __init__(self):
+        self.api_key = settings.google_api_key
+        if not self.api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+        
+        # Configure Gemini, sharing one model (and its connection) across judges
+        self.model = _get_model(self.api_key)
+        
+        # LRU cache of Gemini evaluations keyed by validation data hash
+        self.response_cache_size = settings.llm_cache_size
+        self._response_cache = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+        
+    def create_validation_prompt(self, validation_data: Dict[str, Any]) -> str:
+        """
+        Create a comprehensive prompt for Gemini to evaluate the PDF
+        """
+        # Compact JSON: Gemini does not need pretty-printing and it saves tokens
+        return VALIDATION_PROMPT_TEMPLATE.format(
+            payload=self._prompt_payload(validation_data),
+            signature_count=validation_data.get('signature_count', 0),
+            document_type=validation_data.get('document_type', 'unknown')
+        )
+    
+    def _prompt_payload(self, validation_data: Dict[str, Any]) -> str:
+        """
+        Serialize validation data for a prompt, truncating oversized raw text
+        """
+        raw_text = validation_data.get('raw_text')
+        if isinstance(raw_text, str) and len(raw_text) > MAX_RAW_TEXT_CHARS:
+            validation_data = {**validation_data, 'raw_text': raw_text[:MAX_RAW_TEXT_CHARS]}
+        return _json_dumps(validation_data)
+    
+    def _generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None):
+        """
+        Call Gemini, retrying rate limits and transient errors with exponential backoff
+        """
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            try:
+                with GEMINI_CALL_SLOTS:
+                    return self.model.generate_content(
+                        prompt,
+                        generation_config=generation_config,
+                        request_options={"timeout": LLM_REQUEST_TIMEOUT}
+                    )
+            except RETRYABLE_ERRORS as e:
+                if attempt == LLM_MAX_ATTEMPTS - 1:
+                    raise
+                delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_MIN * 2 ** attempt)
+                print(f"Gemini call failed ({e}), retrying in {delay:.0f}s")
+                time.sleep(delay)
     
     def evaluate_pdf(self, validation_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Evaluate PDF using Gemini LLM
         """
+        return self.evaluate_pdf_with_status(validation_data)[0]
+    
+    def evaluate_pdf_with_status(self, validation_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """
+        Evaluate PDF using Gemini LLM, also returning how the result was obtained
+        (success, cached, rule_rejected, json_parse_error or llm_error)
+        """
+        settled, cache_key = self._evaluate_without_llm(validation_data)
+        if settled is not None:
+            return settled
+        
+        try:
+            # Call Gemini
+            response = self._generate(self.create_validation_prompt(validation_data))
+            return self._handle_response(validation_data, cache_key, response.text)
+        except Exception as e:
+            return self._llm_error_result(validation_data, e)
+    
+    def _evaluate_without_llm(self, validation_data: Dict[str, Any]) -> Tuple[Optional[Tuple[Dict[str, Any], str]], Optional[str]]:
+        """
+        Settle the evaluation by rules or cache when possible; returns the
+        (result, status) pair or None, plus the cache key for the Gemini path
+        """
+        rejected = self._rule_based_rejection(validation_data)
+        if rejected is not None:
+            return (rejected, "rule_rejected"), None
+        
+        cache_key = self._cache_key(validation_data)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            return (cached, "cached"), cache_key
+        return None, cache_key
+    
+    def _llm_error_result(self, validation_data: Dict[str, Any], error: Exception) -> Tuple[Dict[str, Any], str]:
+        """
+        Fallback for a failed Gemini call
+        """
+        fallback_result = self._create_fallback_result(validation_data, f"LLM evaluation error: {error}")
+        self._log_to_langfuse(validation_data, fallback_result, "llm_error")
+        return fallback_result, "llm_error"
+    
+    def _handle_response(self, validation_data: Dict[str, Any], cache_key: Optional[str],
+                         response_text: str) -> Tuple[Dict[str, Any], str]:
+        """
+        Parse a Gemini response into a normalized result
+        """
+        # Parse JSON response
         try:
-            # Create prompt
-            prompt = self.create_validation_prompt(validation_data)
+            # Clean response text to extract JSON
+            result = _parse_json_response(response_text)
             
-            # Call Gemini
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+            result = self._normalize_result(result)
             
-            # Parse JSON response
-            try:
-                # Clean response text to extract JSON
-                if response_text.startswith('```json'):
-                    response_text = response_text[7:]
-                if response_text.endswith('```'):
-                    response_text = response_text[:-3]
-                
-                result = json.loads(response_text)
-                
-                # Validate required fields in response
-                required_fields = ['is_valid', 'status', 'confidence', 'issues', 'reasoning']
-                for field in required_fields:
-                    if field not in result:
-                        result[field] = self._get_default_value(field)
-                
-                # Ensure confidence is float
-                try:
-                    result['confidence'] = float(result['confidence'])
-                    result['confidence'] = max(0.0, min(1.0, result['confidence']))
-                except (ValueError, TypeError):
-                    result['confidence'] = 0.5
-                
-                # Log to Langfuse
-                self._log_to_langfuse(validation_data, result, "success")
-                
-                return result
-                
-            except json.JSONDecodeError as e:
-                # Fallback if JSON parsing fails
-                fallback_result = self._create_fallback_result(validation_data, f"JSON parsing error: {e}")
-                self._log_to_langfuse(validation_data, fallback_result, "json_parse_error")
-                return fallback_result
-                
+            # Log to Langfuse
+            self._log_to_langfuse(validation_data, result, "success")
+            
+            self._store_cached_response(cache_key, result)
+            return result, "success"
+            
+        except json.JSONDecodeError as e:
+            # Fallback if JSON parsing fails
+            fallback_result = self._create_fallback_result(validation_data, f"JSON parsing error: {e}")
+            self._log_to_langfuse(validation_data, fallback_result, "json_parse_error")
+            return fallback_result, "json_parse_error"
+    
+    async def aevaluate_pdf(self, validation_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evaluate PDF using Gemini LLM without blocking the event loop
+        """
+        return (await self.aevaluate_pdf_with_status(validation_data))[0]
+    
+    async def aevaluate_pdf_with_status(self, validation_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """
+        Async variant of evaluate_pdf_with_status, only the Gemini call differs
+        """
+        settled, cache_key = self._evaluate_without_llm(validation_data)
+        if settled is not None:
+            return settled
+        
+        try:
+            response = await self._agenerate(self.create_validation_prompt(validation_data))
+            return self._handle_response(validation_data, cache_key, response.text)
         except Exception as e:
-            # Fallback for any other errors
-            fallback_result = self._create_fallback_result(validation_data, f"LLM evaluation error: {e}")
-            self._log_to_langfuse(validation_data, fallback_result, "llm_error")
-            return fallback_result
+            return self._llm_error_result(validation_data, e)
+    
+    async def _agenerate(self, prompt: str):
+        """
+        Async variant of _generate
+        """
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            try:
+                async with _async_call_slot():
+                    return await self.model.generate_content_async(prompt, request_options={"timeout": LLM_REQUEST_TIMEOUT})
+            except RETRYABLE_ERRORS as e:
+                if attempt == LLM_MAX_ATTEMPTS - 1:
+                    raise
+                delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_MIN * 2 ** attempt)
+                print(f"Gemini call failed ({e}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+    
+    async def abatch_evaluate(self, validation_data_list: List[Dict[str, Any]],
+                              concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Evaluate multiple PDFs on the event loop, at most `concurrency` Gemini calls in flight
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or settings.batch_concurrency))
+        
+        async def evaluate(validation_data):
+            async with semaphore:
+                return await self.aevaluate_pdf(validation_data)
+        
+        # gather keeps the input order
+        return await asyncio.gather(*(evaluate(validation_data) for validation_data in validation_data_list))
+    
+    def _rule_based_rejection(self, validation_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Reject without calling Gemini when the outcome is already certain.
+        Invalid signatures always reject the document; empty fields do not
+        qualify since Gemini may still find them in the raw text.
+        """
+        if validation_data.get('signature_valid', True):
+            return None
+        
+        result = self._create_fallback_result(validation_data, "rule-based rejection, LLM skipped", confidence=0.95)
+        # Invalid signatures reject the document whatever the field checks found
+        result["is_valid"] = False
+        result["status"] = "rejected_with_reason"
+        self._log_to_langfuse(validation_data, result, "rule_rejected")
+        return result
+    
+    def _normalize_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in missing response fields and clamp confidence to [0, 1]"""
+        # Validate required fields in response
+        required_fields = ['is_valid', 'status', 'confidence', 'issues', 'reasoning']
+        for field in required_fields:
+            if field not in result:
+                result[field] = self._get_default_value(field)
+        
+        # Ensure confidence is a float in [0, 1], rounded to two decimals
+        confidence = result['confidence']
+        if not isinstance(confidence, (int, float)):
+            try:
+                confidence = float(confidence)
+            except (ValueError, TypeError):
+                confidence = 0.5
+        result['confidence'] = round(max(0.0, min(1.0, float(confidence))), 2)
+        
+        return result
+    
+    def _cache_key(self, validation_data: Dict[str, Any]) -> Optional[str]:
+        """Hash of the canonical JSON form of the validation data"""
+        if self.response_cache_size <= 0:
+            return None
+        canonical = _json_dumps(validation_data, sort_keys=True)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+    
+    def _get_cached_response(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached evaluation, if any"""
+        if cache_key is None:
+            return None
+        with self._response_cache_lock:
+            cached = self._response_cache.get(cache_key)
+            if cached is None:
+                return None
+            self._response_cache.move_to_end(cache_key)
+        return copy.deepcopy(cached)
+    
+    def _store_cached_response(self, cache_key: Optional[str], result: Dict[str, Any]):
+        """Cache a successful evaluation, evicting the least recently used"""
+        if cache_key is None:
+            return
+        with self._response_cache_lock:
+            self._response_cache[cache_key] = copy.deepcopy(result)
+            self._response_cache.move_to_end(cache_key)
+            while len(self._response_cache) > self.response_cache_size:
+                self._response_cache.popitem(last=False)
     
     def _get_default_value(self, field: str) -> Any:
         """Get default value for missing fields"""
@@ -155,54 +503,53 @@ Jawab hanya dengan JSON, tanpa teks tambahan.
         }
         return defaults.get(field, None)
     
-    def _create_fallback_result(self, validation_data: Dict[str, Any], error_msg: str) -> Dict[str, Any]:
+    def _create_fallback_result(self, validation_data: Dict[str, Any], error_msg: str,
+                                confidence: float = 0.3) -> Dict[str, Any]:
         """Create fallback result when LLM evaluation fails"""
         # Basic rule-based validation as fallback
-        issues = []
-        missing_fields = []
+        get = validation_data.get
         
-        # Check required fields
-        required_fields = [
-            "NIK", "Nama", "No Tel", "Email", "Departement", 
-            "Manager", "Range Tanggal", "Range Waktu", "Approved by", "User VPN"
-        ]
+        # Normalize every required field once (values may be None or non-strings)
+        normalized = {field: str(get(field) or "").strip() for field in REQUIRED_FIELDS}
         
-        for field in required_fields:
-            if not validation_data.get(field, "").strip():
-                missing_fields.append(field)
-                issues.append(f"Field '{field}' is missing")
+        # Check required fields
+        missing_fields = [field for field, value in normalized.items() if not value]
+        issues = [f"Field '{field}' is missing" for field in missing_fields]
         
         # Check email format
-        email = validation_data.get("Email", "")
-        if email and "@infomedia.co.id" not in email:
+        email = normalized["Email"]
+        if email and not EMAIL_DOMAIN_RE.search(email):
             issues.append("Email must use @infomedia.co.id domain")
         
         # Check signatures
-        signature_count = validation_data.get('signature_count', 0)
-        if signature_count < 3:
-            issues.append(f"Insufficient signatures: {signature_count}/3 required")
-        
-        is_valid = len(issues) == 0 and signature_count >= 3
-        
-        return {
-            "is_valid": is_valid,
-            "status": "approved_for_processing" if is_valid else "rejected_with_reason",
-            "confidence": 0.3,  # Low confidence for fallback
-            "issues": issues,
-            "reasoning": f"Fallback evaluation due to: {error_msg}",
-            "missing_fields": missing_fields,
-            "signature_analysis": {
-                "count": signature_count,
-                "sufficient": signature_count >= 3,
-                "description": f"Found {signature_count} signatures"
-            },
-            "document_type_analysis": {
-                "detected_type": validation_data.get('document_type', 'unknown'),
-                "confidence": 0.3,
-                "description": "Basic detection only"
-            },
-            "recommendations": ["Please ensure all required fields are filled and document has sufficient signatures"]
+        signature_count = get('signature_count', 0)
+        min_signatures = settings.min_signatures
+        signatures_sufficient = signature_count >= min_signatures
+        if not signatures_sufficient:
+            issues.append(f"Insufficient signatures: {signature_count}/{min_signatures} required")
+        
+        is_valid = len(issues) == 0 and signatures_sufficient
+        
+        result = FALLBACK_RESULT_TEMPLATE.copy()
+        result["confidence"] = confidence
+        if is_valid:
+            result["is_valid"] = True
+            result["status"] = "approved_for_processing"
+        result["issues"] = issues
+        result["reasoning"] = f"Fallback evaluation due to: {error_msg}"
+        result["missing_fields"] = missing_fields
+        result["signature_analysis"] = {
+            "count": signature_count,
+            "sufficient": signatures_sufficient,
+            "description": f"Found {signature_count} signatures"
         }
+        result["document_type_analysis"] = {
+            "detected_type": get('document_type', 'unknown'),
+            "confidence": 0.3,
+            "description": "Basic detection only"
+        }
+        result["recommendations"] = list(FALLBACK_RECOMMENDATIONS)
+        return result
     
     def _log_to_langfuse(self, input_data: Dict[str, Any], output_data: Dict[str, Any], status: str):
         """Log evaluation to Langfuse"""
@@ -224,13 +571,119 @@ Jawab hanya dengan JSON, tanpa teks tambahan.
         except Exception as e:
             print(f"Langfuse logging error: {e}")
     
-    def batch_evaluate(self, validation_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def batch_evaluate(self, validation_data_list: List[Dict[str, Any]], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        Evaluate multiple PDFs in batch
+        Evaluate multiple PDFs in batch, overlapping the Gemini calls
         """
-        results = []
-        for i, validation_data in enumerate(validation_data_list):
-            print(f"Evaluating document {i+1}/{len(validation_data_list)}")
-            result = self.evaluate_pdf(validation_data)
-            results.append(result)
+        total = len(validation_data_list)
+        results = [None] * total
+        max_workers = max(1, min(max_workers or settings.batch_concurrency, total))
+        
+        # Circuit breaker: after too many LLM errors in a row, stop calling
+        # Gemini and evaluate the rest of the batch with the rule-based fallback
+        breaker = {"failures": 0, "open": False}
+        breaker_lock = threading.Lock()
+        
+        def evaluate(validation_data):
+            if breaker["open"]:
+                result = self._create_fallback_result(validation_data, "LLM unavailable, skipped after repeated errors")
+                self._log_to_langfuse(validation_data, result, "llm_skipped")
+                return result
+            result, status = self.evaluate_pdf_with_status(validation_data)
+            with breaker_lock:
+                if status == "llm_error":
+                    breaker["failures"] += 1
+                    if breaker["failures"] >= CIRCUIT_BREAKER_THRESHOLD and not breaker["open"]:
+                        breaker["open"] = True
+                        print(f"Gemini failed {breaker['failures']} times in a row, using fallback for the rest of the batch")
+                elif status in ("success", "json_parse_error"):
+                    # Gemini answered
+                    breaker["failures"] = 0
+            return result
+        
+        # evaluate never raises, it falls back to rule-based evaluation
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(evaluate, validation_data): index
+                for index, validation_data in enumerate(validation_data_list)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                print(f"Evaluated document {done}/{total}")
+        return results
+    
+    def create_packed_prompt(self, validation_data_list: List[Dict[str, Any]]) -> str:
+        """
+        Create one prompt that asks Gemini to judge several documents
+        """
+        documents = "\n".join(
+            f"DOKUMEN {i}:\n{self._prompt_payload(validation_data)}"
+            for i, validation_data in enumerate(validation_data_list, 1)
+        )
+        return PACKED_PROMPT_TEMPLATE.format(count=len(validation_data_list), documents=documents)
+    
+    def evaluate_batch_packed(self, validation_data_list: List[Dict[str, Any]], batch_size: int = 10,
+                              max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Evaluate multiple PDFs with several documents per Gemini call
+        """
+        total = len(validation_data_list)
+        results = [None] * total
+        
+        # Certain rejections never reach Gemini, only the rest are packed
+        pending = []
+        for index, validation_data in enumerate(validation_data_list):
+            rejected = self._rule_based_rejection(validation_data)
+            if rejected is not None:
+                results[index] = rejected
+            else:
+                pending.append(index)
+        
+        step = max(1, batch_size)
+        chunks = [pending[start:start + step] for start in range(0, len(pending), step)]
+        max_workers = max(1, min(max_workers or settings.batch_concurrency, len(chunks)))
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._evaluate_packed_chunk, [validation_data_list[i] for i in indexes]): indexes
+                for indexes in chunks
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                indexes = futures[future]
+                for index, result in zip(indexes, future.result()):
+                    results[index] = result
+                print(f"Evaluated chunk {done}/{len(chunks)} ({len(indexes)} documents)")
+        return results
+    
+    def _evaluate_packed_chunk(self, chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Evaluate one packed chunk, falling back to per-document calls on any mismatch
+        """
+        try:
+            # One answer per document, so scale the output budget with the chunk
+            # up to what the model can return
+            max_output_tokens = min(GEMINI_MAX_OUTPUT_TOKENS, GEMINI_CONFIG["max_tokens"] * len(chunk))
+            response = self._generate(
+                self.create_packed_prompt(chunk),
+                generation_config={"max_output_tokens": max_output_tokens}
+            )
+            parsed = _json_loads(CODE_FENCE_RE.sub("", response.text.strip()))
+            if not isinstance(parsed, list) or len(parsed) != len(chunk):
+                raise ValueError(f"expected a JSON array of {len(chunk)} results")
+            
+            by_id = {item.get("id"): item for item in parsed if isinstance(item, dict)}
+            results = []
+            for i, validation_data in enumerate(chunk, 1):
+                item = by_id.get(i)
+                if item is None:
+                    raise ValueError(f"no result for document {i}")
+                item.pop("id")
+                results.append(self._normalize_result(item))
+        except Exception as e:
+            print(f"Packed evaluation failed ({e}), evaluating documents individually")
+            return [self.evaluate_pdf(validation_data) for validation_data in chunk]
+        
+        for validation_data, result in zip(chunk, results):
+            self._log_to_langfuse(validation_data, result, "success")
+            self._store_cached_response(self._cache_key(validation_data), result)
         return results
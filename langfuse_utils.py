@@ -1,7 +1,11 @@
 # langfuse_utils.py
-from langfuse import Langfuse
 import os
-from typing import Dict, Any, Optional
+import copy
+import uuid
+import queue
+import atexit
+import threading
+from typing import Dict, Any, Optional, Callable
 from datetime import datetime
 
 LF_PUBLIC = os.getenv("LF_PUBLIC_KEY")
@@ -12,6 +16,8 @@ LF_HOST = os.getenv("LF_HOST", "https://api.langfuse.com")
 lf_client = None
 if LF_PUBLIC and LF_SECRET:
     try:
+        # Only pay for importing the SDK when Langfuse is configured
+        from langfuse import Langfuse
         lf_client = Langfuse(public_key=LF_PUBLIC, secret_key=LF_SECRET, host=LF_HOST)
         print("✓ Langfuse initialized successfully")
     except Exception as e:
@@ -20,22 +26,69 @@ if LF_PUBLIC and LF_SECRET:
 else:
     print("⚠ Langfuse not configured (optional)")
 
-def send_trace_minimal(name: str, input_payload: dict, output_payload: dict, metadata: dict = None):
-    """Send minimal trace to Langfuse"""
+# Traces are built on a background worker so Langfuse stays off the validation path
+_trace_queue: "queue.Queue[Callable[[], None]]" = queue.Queue()
+_trace_worker = None
+_trace_worker_lock = threading.Lock()
+
+def _run_trace_worker():
+    """Send queued traces one at a time"""
+    while True:
+        job = _trace_queue.get()
+        try:
+            job()
+        finally:
+            _trace_queue.task_done()
+
+def _submit_trace(job: Callable[[], None]):
+    """Queue a trace job, starting the worker on first use"""
+    global _trace_worker
+    if _trace_worker is None:
+        with _trace_worker_lock:
+            if _trace_worker is None:
+                _trace_worker = threading.Thread(target=_run_trace_worker, name="langfuse-traces", daemon=True)
+                _trace_worker.start()
+    _trace_queue.put(job)
+
+def _snapshot(payload: Any) -> Any:
+    """Copy a payload at submit time, callers may keep changing theirs while the job waits"""
+    return copy.deepcopy(payload)
+
+def flush():
+    """Wait for queued traces and flush them to Langfuse"""
     if not lf_client:
-        return None
+        return
+    _trace_queue.join()
     try:
-        trace = lf_client.trace(name=name, metadata=metadata or {})
-        trace.span(
-            name="pdf_validation_process",
-            input=input_payload,
-            output=output_payload
-        )
-        trace.end()
-        return trace.id
+        lf_client.flush()
     except Exception as e:
-        print("Langfuse trace error:", e)
+        print("Langfuse flush error:", e)
+
+atexit.register(flush)
+
+def send_trace_minimal(name: str, input_payload: dict, output_payload: dict, metadata: dict = None):
+    """Send minimal trace to Langfuse"""
+    if not lf_client:
         return None
+    trace_id = str(uuid.uuid4())
+    input_payload = _snapshot(input_payload)
+    output_payload = _snapshot(output_payload)
+    metadata = _snapshot(metadata or {})
+    
+    def job():
+        try:
+            trace = lf_client.trace(id=trace_id, name=name, metadata=metadata)
+            trace.span(
+                name="pdf_validation_process",
+                input=input_payload,
+                output=output_payload
+            )
+            trace.end()
+        except Exception as e:
+            print("Langfuse trace error:", e)
+    
+    _submit_trace(job)
+    return trace_id
 
 def send_detailed_trace(
     name: str, 
@@ -47,30 +100,43 @@ def send_detailed_trace(
     """Send detailed trace with multiple spans to Langfuse"""
     if not lf_client:
         return None
+    trace_id = str(uuid.uuid4())
+    input_payload = _snapshot(input_payload)
+    output_payload = _snapshot(output_payload)
+    trace_metadata = _snapshot(metadata or {})
+    spans = _snapshot(spans)
     
-    try:
-        trace = lf_client.trace(
-            name=name, 
-            metadata=metadata or {},
-            input=input_payload,
-            output=output_payload
-        )
-        
-        # Add custom spans if provided
-        if spans:
-            for span in spans:
-                trace.span(
-                    name=span.get("name", "custom_span"),
-                    input=span.get("input", {}),
-                    output=span.get("output", {}),
-                    metadata=span.get("metadata", {})
-                )
-        
-        trace.end()
-        return trace.id
-    except Exception as e:
-        print("Langfuse detailed trace error:", e)
-        return None
+    def job():
+        try:
+            trace = lf_client.trace(
+                id=trace_id,
+                name=name, 
+                metadata=trace_metadata,
+                input=input_payload,
+                output=output_payload
+            )
+            
+            # Add custom spans if provided
+            if spans:
+                for span in spans:
+                    # Entries already on the trace are not serialized again for every span
+                    span_metadata = {
+                        key: value for key, value in span.get("metadata", {}).items()
+                        if key not in trace_metadata or trace_metadata[key] != value
+                    }
+                    trace.span(
+                        name=span.get("name", "custom_span"),
+                        input=span.get("input", {}),
+                        output=span.get("output", {}),
+                        metadata=span_metadata
+                    )
+            
+            trace.end()
+        except Exception as e:
+            print("Langfuse detailed trace error:", e)
+    
+    _submit_trace(job)
+    return trace_id
 
 def log_validation_metrics(
     document_type: str,
@@ -83,68 +149,79 @@ def log_validation_metrics(
     """Log validation metrics to Langfuse"""
     if not lf_client:
         return None
+    trace_id = str(uuid.uuid4())
+    timestamp = datetime.now().isoformat()
     
-    try:
-        trace = lf_client.trace(
-            name="validation_metrics",
-            metadata={
-                "document_type": document_type,
-                "is_valid": is_valid,
-                "confidence": confidence,
-                "processing_time": processing_time,
-                "signature_count": signature_count,
-                "issues_count": issues_count,
-                "timestamp": datetime.now().isoformat()
-            }
-        )
-        
-        trace.span(
-            name="validation_summary",
-            input={
-                "document_type": document_type,
-                "signature_count": signature_count
-            },
-            output={
-                "is_valid": is_valid,
-                "confidence": confidence,
-                "processing_time": processing_time,
-                "issues_count": issues_count
-            }
-        )
-        
-        trace.end()
-        return trace.id
-    except Exception as e:
-        print("Langfuse metrics logging error:", e)
-        return None
+    def job():
+        try:
+            trace = lf_client.trace(
+                id=trace_id,
+                name="validation_metrics",
+                metadata={
+                    "document_type": document_type,
+                    "is_valid": is_valid,
+                    "confidence": confidence,
+                    "processing_time": processing_time,
+                    "signature_count": signature_count,
+                    "issues_count": issues_count,
+                    "timestamp": timestamp
+                }
+            )
+            
+            trace.span(
+                name="validation_summary",
+                input={
+                    "document_type": document_type,
+                    "signature_count": signature_count
+                },
+                output={
+                    "is_valid": is_valid,
+                    "confidence": confidence,
+                    "processing_time": processing_time,
+                    "issues_count": issues_count
+                }
+            )
+            
+            trace.end()
+        except Exception as e:
+            print("Langfuse metrics logging error:", e)
+    
+    _submit_trace(job)
+    return trace_id
 
 def log_error(error_type: str, error_message: str, context: Dict[str, Any] = None) -> Optional[str]:
     """Log error to Langfuse"""
     if not lf_client:
         return None
+    trace_id = str(uuid.uuid4())
+    timestamp = datetime.now().isoformat()
+    context = _snapshot(context or {})
     
-    try:
-        trace = lf_client.trace(
-            name="validation_error",
-            metadata={
-                "error_type": error_type,
-                "error_message": error_message,
-                "timestamp": datetime.now().isoformat(),
-                "context": context or {}
-            }
-        )
-        
-        trace.span(
-            name="error_details",
-            input=context or {},
-            output={
-                "error_type": error_type,
-                "error_message": error_message
-            }
-        )
-        
-        trace.end()
-        return trace.id
-    except Exception as e:
-        print("Langfuse error logging error:", e)
-        return None
+    def job():
+        try:
+            trace = lf_client.trace(
+                id=trace_id,
+                name="validation_error",
+                metadata={
+                    "error_type": error_type,
+                    "error_message": error_message,
+                    "timestamp": timestamp,
+                    "context": context
+                }
+            )
+            
+            trace.span(
+                name="error_details",
+                input=context,
+                output={
+                    "error_type": error_type,
+                    "error_message": error_message
+                }
+            )
+            
+            trace.end()
+        except Exception as e:
+            print("Langfuse error logging error:", e)
+    
+    _submit_trace(job)
+    return trace_id
@@ -1,6 +1,13 @@
 import io
+import os
 import re
-from typing import Dict, List, Any, Optional, Tuple
+import sys
+import copy
+import threading
+from collections import OrderedDict, deque
+from contextlib import ExitStack, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Union, BinaryIO
 import PyPDF2
 import pdfplumber
 from PIL import Image
@@ -8,15 +15,77 @@ import cv2
 import numpy as np
 from config import settings
 
+# Common field patterns, compiled once. Field names are interned since they
+# are used as dict keys in every lookup down the validation pipeline.
+# Values are bounded and stay on one line, so a field never runs on into the
+# next label and a match cannot scan through the rest of the document.
+FORM_FIELD_PATTERNS = {
+    sys.intern(field_name): re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+    for field_name, pattern in (
+        ("NIK", r"(?:NIK|Nomor Induk Karyawan)[\s:]*([A-Z0-9]{1,32})"),
+        ("Nama", r"(?:Nama|Name)[\s:]*([A-Za-z \t]{1,80})"),
+        ("No Tel", r"(?:No\.?\s*Tel|Telepon|Phone)[\s:]*([0-9 \t\-\+\(\)]{1,25})"),
+        ("Email", r"(?:Email|E-mail)[\s:]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})"),
+        ("Departement", r"(?:Departement|Department|Dept)[\s:]*([A-Za-z \t]{1,80})"),
+        ("Manager", r"(?:Manager|Atasan)[\s:]*([A-Za-z \t]{1,80})"),
+        ("Range Tanggal", r"(?:Range Tanggal|Date Range)[\s:]*([0-9 \t\-\/]{1,30})"),
+        ("Range Waktu", r"(?:Range Waktu|Time Range)[\s:]*([0-9 \t\-\:]{1,30})"),
+        ("Approved by", r"(?:Approved by|Disetujui oleh)[\s:]*([A-Za-z \t]{1,80})"),
+        ("User VPN", r"(?:User VPN|VPN User)[\s:]*([A-Za-z0-9 \t]{1,64})")
+    )
+}
+
+# Keywords for new VPN request
+NEW_VPN_KEYWORDS = (
+    "permohonan vpn baru",
+    "request vpn baru",
+    "pengajuan vpn baru",
+    "new vpn request",
+    "vpn baru",
+    "permohonan akses vpn"
+)
+
+# Keywords for VPN extension
+EXTENSION_KEYWORDS = (
+    "perpanjangan vpn",
+    "vpn extension",
+    "perpanjangan akses vpn",
+    "extend vpn",
+    "renewal vpn",
+    "perpanjangan"
+)
+
+# Threads analysing rendered pages for signatures
+SIGNATURE_WORKERS = min(4, os.cpu_count() or 1)
+
+# pdfium renders pages for pdfplumber and is not thread-safe, so every render
+# in the process goes through this lock (batch validations share threads)
+RENDER_LOCK = threading.Lock()
+
 class PDFProcessor:
     """PDF processing class for extracting content and validating signatures"""
     
     def __init__(self):
         self.min_signatures = settings.min_signatures
         
-    def extract_text_content(self, pdf_path: str) -> Dict[str, Any]:
+        # LRU cache of parsed PDFs keyed by (path, mtime, size)
+        self.pdf_cache_size = settings.pdf_cache_size
+        self._pdf_cache = OrderedDict()
+        self._pdf_cache_lock = threading.Lock()
+        
+    def _open_pdf(self, pdf_source: Union[str, BinaryIO, pdfplumber.PDF]):
+        """
+        Open a path or stream with pdfplumber; an already open document is used as is
         """
-        Extract text content from PDF using multiple methods
+        if isinstance(pdf_source, pdfplumber.PDF):
+            # Left open, the caller owns it
+            return nullcontext(pdf_source)
+        return pdfplumber.open(pdf_source)
+    
+    def extract_text_content(self, pdf_path: Union[str, BinaryIO, pdfplumber.PDF]) -> Dict[str, Any]:
+        """
+        Extract text content from PDF (file path, binary stream or open
+        pdfplumber document) using multiple methods
         """
         content = {
             "raw_text": "",
@@ -27,81 +96,79 @@ class PDFProcessor:
         
         try:
             # Method 1: Using pdfplumber (better for structured data)
-            with pdfplumber.open(pdf_path) as pdf:
-                full_text = ""
+            with self._open_pdf(pdf_path) as pdf:
+                text_parts = []
+                pdf_reader = None
                 for i, page in enumerate(pdf.pages):
-                    page_text = page.extract_text() or ""
-                    full_text += f"\n--- Page {i+1} ---\n{page_text}"
+                    try:
+                        page_text = page.extract_text() or ""
+                        
+                        # Extract tables if any
+                        tables = page.extract_tables()
+                    except Exception as e:
+                        # Only this page falls back to PyPDF2, the others keep pdfplumber's output
+                        print(f"pdfplumber extraction failed on page {i+1}: {e}")
+                        if pdf_reader is None:
+                            pdf_reader = self._read_shared_stream(pdf.stream, lambda: PyPDF2.PdfReader(pdf.stream))
+                        page_text = self._read_shared_stream(pdf.stream, lambda: pdf_reader.pages[i].extract_text() or "")
+                        tables = []
+                        content["extraction_method"] = "pdfplumber+PyPDF2"
                     
-                    # Extract tables if any
-                    tables = page.extract_tables()
-                    if tables:
-                        content["pages"].append({
-                            "page_number": i + 1,
-                            "text": page_text,
-                            "tables": tables
-                        })
-                    else:
-                        content["pages"].append({
-                            "page_number": i + 1,
-                            "text": page_text,
-                            "tables": []
-                        })
+                    text_parts.append(f"\n--- Page {i+1} ---\n{page_text}")
+                    content["pages"].append({
+                        "page_number": i + 1,
+                        "text": page_text,
+                        "tables": tables or []
+                    })
                 
-                content["raw_text"] = full_text
+                content["raw_text"] = "".join(text_parts)
                 
         except Exception as e:
             print(f"pdfplumber extraction failed: {e}")
+            content["pages"] = []
             
             # Fallback: Using PyPDF2
             try:
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    full_text = ""
-                    for i, page in enumerate(pdf_reader.pages):
-                        page_text = page.extract_text()
-                        full_text += f"\n--- Page {i+1} ---\n{page_text}"
-                        content["pages"].append({
-                            "page_number": i + 1,
-                            "text": page_text,
-                            "tables": []
-                        })
-                    content["raw_text"] = full_text
-                    content["extraction_method"] = "PyPDF2"
+                # PdfReader accepts both a path and an open binary stream
+                if isinstance(pdf_path, pdfplumber.PDF):
+                    pdf_reader = PyPDF2.PdfReader(pdf_path.stream)
+                else:
+                    pdf_reader = PyPDF2.PdfReader(pdf_path)
+                text_parts = []
+                for i, page in enumerate(pdf_reader.pages):
+                    page_text = page.extract_text()
+                    text_parts.append(f"\n--- Page {i+1} ---\n{page_text}")
+                    content["pages"].append({
+                        "page_number": i + 1,
+                        "text": page_text,
+                        "tables": []
+                    })
+                content["raw_text"] = "".join(text_parts)
+                content["extraction_method"] = "PyPDF2"
             except Exception as e2:
                 print(f"PyPDF2 extraction also failed: {e2}")
                 content["error"] = f"PDF extraction failed: {e2}"
         
         return content
     
+    def _read_shared_stream(self, stream: BinaryIO, read):
+        """
+        Run a PyPDF2 read on the stream pdfplumber is parsing, then restore its position
+        """
+        position = stream.tell()
+        try:
+            return read()
+        finally:
+            stream.seek(position)
+    
     def detect_document_type(self, text_content: str) -> Dict[str, Any]:
         """
         Detect if document is VPN request or extension based on content
         """
         text_lower = text_content.lower()
         
-        # Keywords for new VPN request
-        new_vpn_keywords = [
-            "permohonan vpn baru",
-            "request vpn baru", 
-            "pengajuan vpn baru",
-            "new vpn request",
-            "vpn baru",
-            "permohonan akses vpn"
-        ]
-        
-        # Keywords for VPN extension
-        extension_keywords = [
-            "perpanjangan vpn",
-            "vpn extension",
-            "perpanjangan akses vpn",
-            "extend vpn",
-            "renewal vpn",
-            "perpanjangan"
-        ]
-        
-        new_vpn_score = sum(1 for keyword in new_vpn_keywords if keyword in text_lower)
-        extension_score = sum(1 for keyword in extension_keywords if keyword in text_lower)
+        new_vpn_score = sum(keyword in text_lower for keyword in NEW_VPN_KEYWORDS)
+        extension_score = sum(keyword in text_lower for keyword in EXTENSION_KEYWORDS)
         
         if new_vpn_score > extension_score:
             document_type = "new_vpn_request"
@@ -126,30 +193,15 @@ class PDFProcessor:
         """
         fields = {}
         
-        # Common field patterns
-        field_patterns = {
-            "NIK": r"(?:NIK|Nomor Induk Karyawan)[\s:]*([A-Z0-9]+)",
-            "Nama": r"(?:Nama|Name)[\s:]*([A-Za-z\s]+)",
-            "No Tel": r"(?:No\.?\s*Tel|Telepon|Phone)[\s:]*([0-9\s\-\+\(\)]+)",
-            "Email": r"(?:Email|E-mail)[\s:]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})",
-            "Departement": r"(?:Departement|Department|Dept)[\s:]*([A-Za-z\s]+)",
-            "Manager": r"(?:Manager|Atasan)[\s:]*([A-Za-z\s]+)",
-            "Range Tanggal": r"(?:Range Tanggal|Date Range)[\s:]*([0-9\s\-\/]+)",
-            "Range Waktu": r"(?:Range Waktu|Time Range)[\s:]*([0-9\s\-\:]+)",
-            "Approved by": r"(?:Approved by|Disetujui oleh)[\s:]*([A-Za-z\s]+)",
-            "User VPN": r"(?:User VPN|VPN User)[\s:]*([A-Za-z0-9\s]+)"
-        }
-        
-        for field_name, pattern in field_patterns.items():
-            matches = re.findall(pattern, text_content, re.IGNORECASE | re.MULTILINE)
-            if matches:
-                # Take the first match and clean it
-                value = matches[0].strip()
-                fields[field_name] = value
+        for field_name, pattern in FORM_FIELD_PATTERNS.items():
+            # Only the first match is used, no need to collect them all
+            match = pattern.search(text_content)
+            if match:
+                fields[field_name] = match.group(1).strip()
         
         return fields
     
-    def detect_signatures(self, pdf_path: str) -> Dict[str, Any]:
+    def detect_signatures(self, pdf_path: Union[str, BinaryIO, pdfplumber.PDF]) -> Dict[str, Any]:
         """
         Detect signatures in PDF using image processing
         """
@@ -161,44 +213,19 @@ class PDFProcessor:
         }
         
         try:
-            with pdfplumber.open(pdf_path) as pdf:
+            # Rendering goes through pdfium, which is not thread-safe, so pages are
+            # rendered one by one while the image analysis of earlier pages runs
+            # on worker threads (OpenCV releases the GIL)
+            with self._open_pdf(pdf_path) as pdf, ThreadPoolExecutor(max_workers=SIGNATURE_WORKERS) as executor:
+                # Each rendered page is a full-resolution image, so only a window
+                # of SIGNATURE_WORKERS pages is in flight; results stay in page order
+                pending = deque()
                 for page_num, page in enumerate(pdf.pages):
-                    # Convert page to image
-                    page_image = page.to_image(resolution=150)
-                    img_array = np.array(page_image.original)
-                    
-                    # Convert to grayscale
-                    gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-                    
-                    # Apply threshold to detect dark areas (signatures)
-                    _, thresh = cv2.threshold(gray, 100, 255, cv2.THRESH_BINARY_INV)
-                    
-                    # Find contours
-                    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    
-                    # Filter contours that might be signatures
-                    for contour in contours:
-                        area = cv2.contourArea(contour)
-                        x, y, w, h = cv2.boundingRect(contour)
-                        
-                        # Signature characteristics: reasonable size and aspect ratio
-                        if (area > 500 and area < 50000 and 
-                            w > 50 and h > 20 and 
-                            w/h > 1.5 and w/h < 8):
-                            
-                            signature_info["signature_count"] += 1
-                            signature_info["signature_locations"].append({
-                                "page": page_num + 1,
-                                "x": x, "y": y, "width": w, "height": h,
-                                "area": area
-                            })
-                            
-                            signature_info["signature_details"].append({
-                                "page": page_num + 1,
-                                "coordinates": (x, y, w, h),
-                                "area": area,
-                                "confidence": min(0.9, area / 10000)
-                            })
+                    if len(pending) >= SIGNATURE_WORKERS:
+                        self._collect_page_signatures(signature_info, pending.popleft())
+                    pending.append(executor.submit(self._find_page_signatures, self._render_page(page), page_num + 1))
+                while pending:
+                    self._collect_page_signatures(signature_info, pending.popleft())
         
         except Exception as e:
             print(f"Signature detection error: {e}")
@@ -211,12 +238,116 @@ class PDFProcessor:
         
         return signature_info
     
-    def process_pdf(self, pdf_path: str) -> Dict[str, Any]:
+    def _collect_page_signatures(self, signature_info: Dict[str, Any], future: Future):
+        """
+        Add the signatures found on one page to signature_info
+        """
+        for location, detail in future.result():
+            signature_info["signature_count"] += 1
+            signature_info["signature_locations"].append(location)
+            signature_info["signature_details"].append(detail)
+    
+    def _render_page(self, page) -> Image.Image:
         """
-        Main method to process PDF and extract all information
+        Render one page for signature detection, serialized across threads
+        """
+        with RENDER_LOCK:
+            return page.to_image(resolution=150).original
+    
+    def _find_page_signatures(self, page_image: Image.Image, page_number: int) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Find signature-like shapes on one rendered page, as (location, detail) pairs
+        """
+        # Convert to grayscale before leaving PIL, so only one channel is copied out
+        gray = np.asarray(page_image.convert("L"))
+        
+        # Apply threshold to detect dark areas (signatures)
+        _, thresh = cv2.threshold(gray, 100, 255, cv2.THRESH_BINARY_INV)
+        
+        # Find contours
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        if not contours:
+            return []
+        
+        # Measure every contour, then filter them all at once
+        rects = np.array([cv2.boundingRect(contour) for contour in contours], dtype=np.int32)
+        areas = np.array([cv2.contourArea(contour) for contour in contours], dtype=np.float64)
+        widths, heights = rects[:, 2], rects[:, 3]
+        aspect = widths / np.maximum(heights, 1)
+        
+        # Signature characteristics: reasonable size and aspect ratio
+        candidates = np.flatnonzero(
+            (areas > 500) & (areas < 50000) &
+            (widths > 50) & (heights > 20) &
+            (aspect > 1.5) & (aspect < 8)
+        )
+        
+        signatures = []
+        for index in candidates:
+            x, y, w, h = (int(value) for value in rects[index])
+            area = float(areas[index])
+            signatures.append((
+                {
+                    "page": page_number,
+                    "x": x, "y": y, "width": w, "height": h,
+                    "area": area
+                },
+                {
+                    "page": page_number,
+                    "coordinates": (x, y, w, h),
+                    "area": area,
+                    "confidence": min(0.9, area / 10000)
+                }
+            ))
+        return signatures
+    
+    def process_pdf(self, pdf_path: Union[str, BinaryIO], file_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Main method to process PDF and extract all information.
+        `pdf_path` may be a file path or a binary stream; `file_path` names
+        the document in the result when a stream is given.
+        """
+        cache_key = self._cache_key(pdf_path)
+        if cache_key is not None:
+            with self._pdf_cache_lock:
+                cached = self._pdf_cache.get(cache_key)
+                if cached is not None:
+                    self._pdf_cache.move_to_end(cache_key)
+            if cached is not None:
+                result = copy.deepcopy(cached)
+                result["file_path"] = file_path or pdf_path
+                return result
+        
+        result = self._process_pdf(pdf_path, file_path)
+        
+        if cache_key is not None and result["processing_status"] == "success":
+            with self._pdf_cache_lock:
+                self._pdf_cache[cache_key] = copy.deepcopy(result)
+                self._pdf_cache.move_to_end(cache_key)
+                while len(self._pdf_cache) > self.pdf_cache_size:
+                    self._pdf_cache.popitem(last=False)
+        
+        return result
+    
+    def _cache_key(self, pdf_path: Union[str, BinaryIO]) -> Optional[Tuple[str, int, int]]:
+        """
+        Cache key for a file path, or None when the source cannot be cached
+        """
+        if self.pdf_cache_size <= 0 or not isinstance(pdf_path, str):
+            return None
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return None
+        return (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+    
+    def _process_pdf(self, pdf_path: Union[str, BinaryIO], file_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process a PDF without consulting the cache
         """
         result = {
-            "file_path": pdf_path,
+            "file_path": file_path or pdf_path,
             "processing_status": "success",
             "extracted_content": {},
             "document_type": {},
@@ -226,8 +357,19 @@ class PDFProcessor:
         }
         
         try:
-            # Extract text content
-            result["extracted_content"] = self.extract_text_content(pdf_path)
+            with ExitStack() as stack:
+                # Text extraction and signature detection share one parsed document
+                try:
+                    pdf_source = stack.enter_context(pdfplumber.open(pdf_path))
+                except Exception:
+                    # Both steps report the failure and fall back on their own
+                    pdf_source = pdf_path
+                
+                # Extract text content
+                result["extracted_content"] = self.extract_text_content(pdf_source)
+                
+                # Detect signatures
+                result["signature_info"] = self.detect_signatures(pdf_source)
             
             # Detect document type
             result["document_type"] = self.detect_document_type(
@@ -239,9 +381,6 @@ class PDFProcessor:
                 result["extracted_content"]["raw_text"]
             )
             
-            # Detect signatures
-            result["signature_info"] = self.detect_signatures(pdf_path)
-            
             # Combine all data for validation
             validation_data = {
                 **result["form_fields"],
@@ -1,9 +1,20 @@
+import io
 import os
+import mmap
+import copy
 import json
-from typing import Dict, Any, List, Optional
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Union, BinaryIO
 from datetime import datetime
 from pdf_processor import PDFProcessor
-from gemini_judge import GeminiJudge
+from gemini_judge import GeminiJudge, CACHEABLE_LLM_STATUSES
+import langfuse_utils
 from langfuse_utils import send_trace_minimal
 from config import settings
 
@@ -17,14 +28,84 @@ class PDFValidatorAgent:
         self.gemini_judge = GeminiJudge()
         self.app_name = settings.app_name
         
-    def validate_pdf_file(self, pdf_path: str) -> Dict[str, Any]:
+        # LRU cache of validation results keyed by PDF content hash
+        self.result_cache_size = settings.result_cache_size
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        
+    def validate_pdf_file(self, pdf_path: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Main method to validate a PDF file
         """
+        digest = self._file_digest(pdf_path) if use_cache else None
+        return self._validate_cached(digest, pdf_path, pdf_path)
+    
+    def validate_pdf_bytes(self, pdf_bytes: bytes, filename: str = "document.pdf", use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Validate a PDF held in memory without writing it to disk
+        """
+        digest = hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest() if use_cache else None
+        return self._validate_cached(digest, io.BytesIO(pdf_bytes), filename)
+    
+    def _file_digest(self, pdf_path: str) -> Optional[str]:
+        """
+        Hash the file content, or None if the file cannot be read
+        """
+        try:
+            with open(pdf_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    # mmap cannot map an empty file
+                    return hashlib.blake2b(digest_size=16).hexdigest()
+                # Hash straight from the page cache instead of copying into bytes chunks
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return hashlib.blake2b(mapped, digest_size=16).hexdigest()
+        except (OSError, ValueError):
+            return None
+    
+    def _validate_cached(self, digest: Optional[str], pdf_source: Union[str, BinaryIO], pdf_path: str) -> Dict[str, Any]:
+        """
+        Return the cached result for identical content, otherwise validate and cache
+        """
+        if digest is None or self.result_cache_size <= 0:
+            return self._validate(pdf_source, pdf_path)
+        
+        with self._result_cache_lock:
+            cached = self._result_cache.get(digest)
+            if cached is not None:
+                self._result_cache.move_to_end(digest)
+        
+        if cached is not None:
+            print(f"Using cached validation result for: {pdf_path}")
+            result = copy.deepcopy(cached)
+            result["file_path"] = pdf_path
+            result["filename"] = os.path.basename(pdf_path)
+            result["timestamp"] = datetime.now().isoformat()
+            result["processing_time_seconds"] = 0
+            result["cached"] = True
+            return result
+        
+        result = self._validate(pdf_source, pdf_path)
+        
+        # Errors and Gemini fallbacks may be transient, only cache completed validations
+        if (result["final_result"].get("status") != "error"
+                and result.get("llm_evaluation_status") in CACHEABLE_LLM_STATUSES):
+            with self._result_cache_lock:
+                self._result_cache[digest] = copy.deepcopy(result)
+                self._result_cache.move_to_end(digest)
+                while len(self._result_cache) > self.result_cache_size:
+                    self._result_cache.popitem(last=False)
+        
+        return result
+    
+    def _validate(self, pdf_source: Union[str, BinaryIO], pdf_path: str) -> Dict[str, Any]:
+        """
+        Run the validation pipeline on a file path or binary stream
+        """
         start_time = datetime.now()
         
         result = {
             "file_path": pdf_path,
+            "filename": os.path.basename(pdf_path),
             "timestamp": start_time.isoformat(),
             "agent_version": "1.0.0",
             "processing_steps": [],
@@ -41,7 +122,7 @@ class PDFValidatorAgent:
                 "timestamp": datetime.now().isoformat()
             })
             
-            pdf_data = self.pdf_processor.process_pdf(pdf_path)
+            pdf_data = self.pdf_processor.process_pdf(pdf_source, pdf_path)
             result["pdf_processing"] = pdf_data
             
             if pdf_data["processing_status"] == "error":
@@ -64,8 +145,9 @@ class PDFValidatorAgent:
             })
             
             validation_data = pdf_data["validation_data"]
-            llm_result = self.gemini_judge.evaluate_pdf(validation_data)
+            llm_result, llm_status = self.gemini_judge.evaluate_pdf_with_status(validation_data)
             result["llm_evaluation"] = llm_result
+            result["llm_evaluation_status"] = llm_status
             
             result["processing_steps"][-1]["status"] = "completed"
             
@@ -132,10 +214,11 @@ class PDFValidatorAgent:
             reasons = []
             
             if not signature_valid:
-                reasons.append(f"Insufficient signatures: {signature_count}/3 required")
+                reasons.append(f"Insufficient signatures: {signature_count}/{self.pdf_processor.min_signatures} required")
             
             if llm_issues:
-                reasons.extend(llm_issues[:3])  # Limit to top 3 issues
+                # Limit to top 3 issues; the fallback judge repeats the signature reason
+                reasons.extend(issue for issue in llm_issues[:3] if issue not in reasons)
             
             if not reasons:
                 reasons.append("Document does not meet validation criteria")
@@ -152,19 +235,68 @@ class PDFValidatorAgent:
             "signature_valid": signature_valid,
             "issues": llm_issues,
             "reasoning": llm_reasoning,
-            "form_fields_completeness": len([f for f in form_fields.values() if f.strip()]) / len(form_fields) if form_fields else 0,
+            "form_fields_completeness": sum(1 for value in form_fields.values() if value) / len(form_fields) if form_fields else 0,
             "recommendations": llm_result.get("recommendations", [])
         }
     
-    def validate_multiple_pdfs(self, pdf_paths: List[str]) -> List[Dict[str, Any]]:
+    def validate_multiple_pdfs(self, pdf_paths: List[str], max_workers: Optional[int] = None,
+                               jsonl_path: Optional[str] = None, use_processes: bool = False) -> List[Dict[str, Any]]:
         """
-        Validate multiple PDF files
+        Validate multiple PDF files concurrently, results keep the input order.
+        Threads overlap parsing and Gemini calls; page rendering is serialized
+        by pdf_processor.RENDER_LOCK since pdfium is not thread-safe.
+        If jsonl_path is given, each result is appended to it as soon as it completes.
+        With use_processes, PDFs are validated in spawned worker processes, each
+        with its own agent (and so its own caches and Gemini concurrency limit).
+        Spawned workers re-import the calling script, so a script using it must
+        call it under an `if __name__ == "__main__":` guard.
         """
-        results = []
-        for i, pdf_path in enumerate(pdf_paths):
-            print(f"\n=== Processing PDF {i+1}/{len(pdf_paths)}: {os.path.basename(pdf_path)} ===")
-            result = self.validate_pdf_file(pdf_path)
-            results.append(result)
+        total = len(pdf_paths)
+        results = [None] * total
+        max_workers = max(1, min(max_workers or settings.batch_concurrency, total))
+        
+        # Rendering and OpenCV are CPU bound, processes sidestep the GIL for them.
+        # Workers are spawned rather than forked so they don't inherit this
+        # process's Gemini client, locks or Langfuse worker state
+        if use_processes and total > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            validate = _validate_in_worker
+        else:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            validate = self.validate_pdf_file
+        
+        # Stream results so an interrupted batch keeps everything finished so far
+        jsonl_context = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else nullcontext()
+        
+        with jsonl_context as jsonl_file, executor:
+            futures = {
+                executor.submit(validate, pdf_path): index
+                for index, pdf_path in enumerate(pdf_paths)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                pdf_path = pdf_paths[index]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    # Keep going with the rest of the batch
+                    results[index] = {
+                        "file_path": pdf_path,
+                        "final_result": {
+                            "status": "error",
+                            "message": f"Validation failed: {str(e)}",
+                            "is_valid": False
+                        },
+                        "processing_time_seconds": 0,
+                        "error": str(e)
+                    }
+                if jsonl_file:
+                    jsonl_file.write(json.dumps(results[index], ensure_ascii=False, default=str) + "\n")
+                    jsonl_file.flush()
+                print(f"\n=== Processed PDF {done}/{total}: {os.path.basename(pdf_path)} ===")
         
         # Generate summary
         summary = self._generate_batch_summary(results)
@@ -182,12 +314,22 @@ class PDFValidatorAgent:
         Generate summary of batch processing results
         """
         total = len(results)
-        approved = sum(1 for r in results if r["final_result"].get("is_valid", False))
-        rejected = sum(1 for r in results if r["final_result"].get("status") == "rejected_with_reason")
-        errors = sum(1 for r in results if r["final_result"].get("status") == "error")
+        approved = rejected = errors = 0
+        total_time = 0.0
+        
+        # Single pass over the results
+        for r in results:
+            final_result = r["final_result"]
+            if final_result.get("is_valid", False):
+                approved += 1
+            status = final_result.get("status")
+            if status == "rejected_with_reason":
+                rejected += 1
+            elif status == "error":
+                errors += 1
+            total_time += r.get("processing_time_seconds", 0)
         
-        processing_times = [r.get("processing_time_seconds", 0) for r in results]
-        avg_time = sum(processing_times) / len(processing_times) if processing_times else 0
+        avg_time = total_time / total if total else 0
         
         return {
             "total_processed": total,
@@ -272,7 +414,7 @@ class PDFValidatorAgent:
         
         report = f"""
 === PDF VALIDATION REPORT ===
-File: {os.path.basename(result['file_path'])}
+File: {result.get('filename') or os.path.basename(result['file_path'])}
 Timestamp: {result['timestamp']}
 Processing Time: {result['processing_time_seconds']:.2f} seconds
 
@@ -283,7 +425,7 @@ Confidence: {final_result.get('confidence', 0.0):.2f}
 
 DOCUMENT ANALYSIS:
 Type: {final_result.get('document_type', 'unknown')}
-Signatures: {final_result.get('signature_count', 0)}/3 required
+Signatures: {final_result.get('signature_count', 0)}/{self.pdf_processor.min_signatures} required
 Signature Valid: {'YES' if final_result.get('signature_valid', False) else 'NO'}
 
 REASONING:
@@ -292,17 +434,36 @@ REASONING:
 ISSUES FOUND:
 """
         
+        # Collect the numbered lists and join once instead of growing the string per line
+        parts = [report]
         issues = final_result.get('issues', [])
         if issues:
-            for i, issue in enumerate(issues, 1):
-                report += f"{i}. {issue}\n"
+            parts.extend(f"{i}. {issue}\n" for i, issue in enumerate(issues, 1))
         else:
-            report += "No issues found.\n"
+            parts.append("No issues found.\n")
         
         recommendations = final_result.get('recommendations', [])
         if recommendations:
-            report += "\nRECOMMENDATIONS:\n"
-            for i, rec in enumerate(recommendations, 1):
-                report += f"{i}. {rec}\n"
+            parts.append("\nRECOMMENDATIONS:\n")
+            parts.extend(f"{i}. {rec}\n" for i, rec in enumerate(recommendations, 1))
         
-        return report
+        return "".join(parts)
+
+
+@lru_cache(maxsize=1)
+def get_validator_agent() -> PDFValidatorAgent:
+    """
+    Shared PDFValidatorAgent for every entry point in the process
+    """
+    return PDFValidatorAgent()
+
+
+def _validate_in_worker(pdf_path: str) -> Dict[str, Any]:
+    """
+    Validate one PDF inside a batch worker process
+    """
+    try:
+        return get_validator_agent().validate_pdf_file(pdf_path)
+    finally:
+        # Pool workers exit without running atexit, send this task's traces now
+        langfuse_utils.flush()
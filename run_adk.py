@@ -6,6 +6,8 @@ Simple launcher for Google ADK web interface
 
 import os
 import sys
+import asyncio
+import importlib.util
 from adk_web_app import get_adk_app, validate_pdf, validate_pdf_bytes, batch_validate, get_config, health
 from adk_config import get_final_config, is_adk_web_enabled
 from config import settings
@@ -19,6 +21,14 @@ def show_adk_info():
     print("Compatible with Google ADK web interface")
     print("=" * 60)
 
+def _module_available(name: str) -> bool:
+    """Check that a module can be imported without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        # Parent package is missing
+        return False
+
 def check_requirements():
     """Check if all requirements are met"""
     print("\n=== CHECKING REQUIREMENTS ===")
@@ -32,18 +42,16 @@ def check_requirements():
         print("✓ Google API Key configured")
     
     # Check dependencies
-    try:
-        import google.generativeai as genai
+    if _module_available("google.generativeai"):
         print("✓ Google Generative AI library available")
-    except ImportError:
+    else:
         print("✗ Google Generative AI library not found")
         print("Please install: pip install google-generativeai")
         return False
     
-    try:
-        import fastapi
+    if _module_available("fastapi"):
         print("✓ FastAPI available")
-    except ImportError:
+    else:
         print("✗ FastAPI not found")
         print("Please install: pip install fastapi uvicorn")
         return False
@@ -110,14 +118,21 @@ def run_adk_web_interface():
     
     try:
         from fastapi import FastAPI
-        from fastapi.responses import JSONResponse
         import uvicorn
         
+        # orjson encodes the nested validation results much faster than stdlib json
+        try:
+            import orjson
+            from fastapi.responses import ORJSONResponse as JSONResponse
+        except ImportError:
+            from fastapi.responses import JSONResponse
+        
         # Create FastAPI app
         app = FastAPI(
             title="PDF Validator Agent - Google ADK",
             description="Google ADK web interface for PDF validation",
-            version="2.0.0"
+            version="2.0.0",
+            default_response_class=JSONResponse
         )
         
         # Add ADK endpoints
@@ -137,17 +152,21 @@ def run_adk_web_interface():
         
         @app.post("/validate-pdf")
         async def validate_pdf_endpoint(pdf_path: str):
-            result = validate_pdf(pdf_path)
+            # Validation blocks on PDF parsing and Gemini, keep it off the event loop.
+            # Concurrent requests only overlap parsing and Gemini, page rendering
+            # is serialized by pdf_processor.RENDER_LOCK
+            result = await asyncio.to_thread(validate_pdf, pdf_path)
             return JSONResponse(content=result)
         
         @app.post("/validate-batch")
-        async def validate_batch_endpoint(pdf_paths: list):
-            result = batch_validate(pdf_paths)
+        async def validate_batch_endpoint(pdf_paths: list, use_cache: bool = True):
+            result = await asyncio.to_thread(batch_validate, pdf_paths, use_cache)
             return JSONResponse(content=result)
         
         @app.get("/health")
         async def health_endpoint():
-            result = health()
+            # The first health check builds the agent
+            result = await asyncio.to_thread(health)
             return JSONResponse(content=result)
         
         @app.get("/config")
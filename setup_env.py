@@ -12,12 +12,14 @@ def create_env_file():
     print("This script will help you set up your environment variables.")
     print()
     
-    # Check if .env already exists
+    # Check if .env already exists, only an explicit overwrite may replace it
+    write_mode = 'x'
     if os.path.exists('.env'):
         overwrite = input(".env file already exists. Overwrite? (y/n): ").strip().lower()
         if overwrite not in ['y', 'yes']:
             print("Setup cancelled.")
             return
+        write_mode = 'w'
     
     print("Enter your API keys (press Enter to skip optional fields):")
     print()
@@ -62,10 +64,14 @@ MAX_FILE_SIZE_MB={max_file_size}
     
     # Write .env file
     try:
-        with open('.env', 'w') as f:
+        # Mode 'x' creates the file atomically and fails if it appeared meanwhile
+        with open('.env', write_mode) as f:
             f.write(env_content)
         print(f"\n✓ .env file created successfully!")
         print("You can now run the PDF Validator Agent.")
+    except FileExistsError:
+        print("\n✗ .env file was created while setup was running, it was left unchanged.")
+        print("Run setup again to overwrite it.")
     except Exception as e:
         print(f"✗ Error creating .env file: {e}")
 